@@ -1,14 +1,18 @@
 import ast
-from typing import Any, Dict, Set, Union
+from typing import Any, Dict, Union
 
 
 AstNameOrAttribute = Union[ast.Name, ast.Attribute]
 AstAnnotationElement = Union[AstNameOrAttribute, ast.Constant, ast.Subscript]
-AstElement = Union[AstAnnotationElement, ast.FunctionDef]
+AstFunctionDef = Union[ast.FunctionDef, ast.AsyncFunctionDef]
+AstElement = Union[AstAnnotationElement, AstFunctionDef]
 
 LiteralValue = Union[None, bool, str, int, float]
 
 Schema = Dict[str, Any]
 NameToSchemaMap = Dict[str, Schema]
+# Translated schemas keyed by their AST element. AST nodes hash by identity, and being keys keeps them alive
+SchemaMemo = Dict[ast.AST, Schema]
 
-TypingNamespace = Dict[str, Set[str]]
+# Maps every imported alias of a supported typing element to its name, i.e. {"typing.List": "List"}
+TypingNamespace = Dict[str, str]
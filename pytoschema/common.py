@@ -1,14 +1,21 @@
 import ast
+import os
+import sys
+from types import MappingProxyType
+from typing import Dict, Optional, Tuple, Union
 
 from .annotations import AstElement, NameToSchemaMap, TypingNamespace
 
 
-BASE_NAME_TO_SCHEMA_MAP = {
-    "bool": {"type": "boolean"},
-    "float": {"type": "number"},
-    "int": {"type": "integer"},
-    "str": {"type": "string"},
-}
+# Read-only prototype. Every name to schema map starts as a shallow copy of it, sharing its schemas
+BASE_NAME_TO_SCHEMA_MAP = MappingProxyType(
+    {
+        "bool": {"type": "boolean"},
+        "float": {"type": "number"},
+        "int": {"type": "integer"},
+        "str": {"type": "string"},
+    }
+)
 
 VALID_SUBSCRIPT_TYPES = frozenset({"Union", "List", "Dict", "Optional", "Literal"})
 VALID_TYPES = VALID_SUBSCRIPT_TYPES | frozenset({"TypedDict", "Any"})
@@ -17,6 +24,7 @@ VALID_TYPES = VALID_SUBSCRIPT_TYPES | frozenset({"TypedDict", "Any"})
 class InvalidTypeAnnotation(Exception):
     def __init__(self, ast_element: AstElement, error: str):
         self.ast_object = ast_element
+        self.error = error
         if ast_element.lineno == ast_element.end_lineno:
             line_str = f"line {ast_element.lineno}"
         else:
@@ -24,19 +32,60 @@ class InvalidTypeAnnotation(Exception):
         column_str = f"character position [{ast_element.col_offset}:{ast_element.end_col_offset}]"
         super().__init__(f"Invalid type annotation on {line_str}, {column_str}. Reason: {error}")
 
+    def __reduce__(self):
+        # Keeps the exception picklable, i.e. when raised from a process pool worker
+        return self.__class__, (self.ast_object, self.error)
+
 
 def init_typing_namespace() -> TypingNamespace:
-    return {valid_type: set() for valid_type in VALID_TYPES}
+    return {}
 
 
 def init_name_to_schema_map() -> NameToSchemaMap:
-    return {key: value for key, value in BASE_NAME_TO_SCHEMA_MAP.items()}
+    return BASE_NAME_TO_SCHEMA_MAP.copy()
 
 
 def get_ast_name_or_attribute_string(ast_element: AstElement) -> str:
     if isinstance(ast_element, ast.Name):
         return ast_element.id
-    elif isinstance(ast_element.value, ast.Name):
-        return f"{ast_element.value.id}.{ast_element.attr}"
-    else:
-        return f"{get_ast_name_or_attribute_string(ast_element.value)}.{ast_element.attr}"
+    parts = []
+    while isinstance(ast_element, ast.Attribute):
+        parts.append(ast_element.attr)
+        ast_element = ast_element.value
+    parts.append(ast_element.id)
+    return sys.intern(".".join(reversed(parts)))
+
+
+def parse_source(source: Union[str, bytes], filename: str = "<unknown>") -> ast.Module:
+    return compile(source, filename, "exec", ast.PyCF_ONLY_AST, dont_inherit=True)
+
+
+# Parsed modules by absolute path, along with the modification time in nanoseconds and size of the parsed file
+_PARSED_FILES: Dict[str, Tuple[int, int, ast.Module]] = {}
+
+
+def read_file(file_path: str) -> Tuple[os.stat_result, bytes]:
+    # The file is stated before it is read, so a change made in between is always seen as newer than the read source.
+    # Source bytes go straight to the parser, which decodes them honouring PEP 263 encoding declarations
+    with open(file_path, "rb") as f:
+        return os.fstat(f.fileno()), f.read()
+
+
+def parse_file(file_path: str, file_contents: Optional[Tuple[os.stat_result, bytes]] = None) -> ast.Module:
+    # Modules are re-parsed only when their file changes. The returned tree is shared, and hence must not be mutated.
+    # The contents can be given when the file was already read by read_file
+    file_path = os.path.abspath(file_path)
+    file_stat = os.stat(file_path) if file_contents is None else file_contents[0]
+    cached_file = _PARSED_FILES.get(file_path)
+    if cached_file is not None and cached_file[:2] == (file_stat.st_mtime_ns, file_stat.st_size):
+        return cached_file[2]
+    if file_contents is None:
+        file_contents = read_file(file_path)
+    file_stat, source = file_contents
+    ast_module = parse_source(source, file_path)
+    _PARSED_FILES[file_path] = (file_stat.st_mtime_ns, file_stat.st_size, ast_module)
+    return ast_module
+
+
+def clear_parse_cache():
+    _PARSED_FILES.clear()
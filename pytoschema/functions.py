@@ -1,43 +1,57 @@
 import ast
+import collections
+import concurrent.futures
 import fnmatch
+import functools
+import itertools
 import logging
 import os
 import pkgutil
+import re
 import typing
 
-from .annotations import TypingNamespace, NameToSchemaMap, Schema
-from .common import init_typing_namespace, init_name_to_schema_map
+from .annotations import AstFunctionDef, TypingNamespace, NameToSchemaMap, Schema
+from .common import init_typing_namespace, init_name_to_schema_map, parse_file, parse_source, read_file
 from .jsonschema import get_schema_from_ast_element, InvalidTypeAnnotation
-from .types import process_import, process_import_from, process_assign, process_class_def
+from .types import process_type_definitions
 
 JSON_SCHEMA_DRAFT = "http://json-schema.org/draft-07/schema#"
 LOGGER = logging.getLogger()
+PREFETCH_WORKERS = 4
+PREFETCH_READ_AHEAD = 2 * PREFETCH_WORKERS
+PROCESS_CHUNKS_PER_WORKER = 4
+# Mutable members are replaced by fresh ones on every copy, so templates are never modified
+INPUT_SCHEMA_TEMPLATE = {
+    "$schema": JSON_SCHEMA_DRAFT,
+    "type": "object",
+    "properties": None,
+    "required": None,
+    "additionalProperties": False,
+}
+OUTPUT_SCHEMA_TEMPLATE = {"$schema": JSON_SCHEMA_DRAFT}
+FUNCTION_DEF_TYPES = frozenset({ast.FunctionDef, ast.AsyncFunctionDef})
 
 
 def process_function_def(
-    ast_function_def: ast.FunctionDef,
+    ast_function_def: AstFunctionDef,
     typing_namespace: TypingNamespace,
     name_to_schema_map: NameToSchemaMap,
 ) -> Schema:
     LOGGER.info(f"Processing function {ast_function_def.name} ...")
     # Validation of not supported: Python 3.8 positional-only arguments and *args. Reason: We pass args as key-value
-    if getattr(ast_function_def.args, "posonlyargs", None):
+    if ast_function_def.args.posonlyargs:
         raise InvalidTypeAnnotation(
             ast_function_def, f"Function '{ast_function_def.name}' contains positional only arguments"
         )
-    if getattr(ast_function_def.args, "vararg", None):
+    if ast_function_def.args.vararg is not None:
         raise InvalidTypeAnnotation(
             ast_function_def,
             f"Function '{ast_function_def.name}' contains a variable number positional arguments i.e. *args",
         )
-    input_schema = {
-        "$schema": JSON_SCHEMA_DRAFT,
-        "type": "object",
-        "properties": {},
-        "required": [],
-        "additionalProperties": False,
-    }
-    output_schema = {"$schema": JSON_SCHEMA_DRAFT}
+    input_schema = INPUT_SCHEMA_TEMPLATE.copy()
+    input_schema["properties"] = {}
+    input_schema["required"] = []
+    output_schema = OUTPUT_SCHEMA_TEMPLATE.copy()
     # Process **kwargs
     if ast_function_def.args.kwarg is not None:
         if ast_function_def.args.kwarg.annotation is None:
@@ -52,10 +66,13 @@ def process_function_def(
     # Positional argument defaults is a non-padded list because you cannot have defaults before non-defaulted args
     # Keyword-only arguments, on the other side, can have defaults at random positions, and the default list is padded
     positional_arg_defaults_padding = len(ast_function_def.args.args) - len(ast_function_def.args.defaults)
-    padded_positional_arg_defaults = [None] * positional_arg_defaults_padding + ast_function_def.args.defaults
     for argument, default in zip(
-        ast_function_def.args.args + ast_function_def.args.kwonlyargs,
-        padded_positional_arg_defaults + ast_function_def.args.kw_defaults,
+        itertools.chain(ast_function_def.args.args, ast_function_def.args.kwonlyargs),
+        itertools.chain(
+            itertools.repeat(None, positional_arg_defaults_padding),
+            ast_function_def.args.defaults,
+            ast_function_def.args.kw_defaults,
+        ),
     ):
         if argument.annotation is None:
             raise InvalidTypeAnnotation(
@@ -79,69 +96,88 @@ def process_function_def(
     }
 
 
+@functools.lru_cache(maxsize=None)
+def _compile_patterns(patterns: typing.Tuple[str, ...]) -> typing.Optional[typing.Pattern[str]]:
+    if not patterns:
+        return None
+    return re.compile("|".join(f"(?:{fnmatch.translate(pattern)})" for pattern in patterns))
+
+
 def filter_by_patterns(
     name: str,
     include_patterns: typing.Optional[typing.List[str]] = None,
     exclude_patterns: typing.Optional[typing.List[str]] = None,
-):
-    def _is_a_pattern(patterns: typing.List[str]):
-        for pattern in patterns:
-            if fnmatch.fnmatch(name, pattern):
-                return True
-        return False
+) -> bool:
+    if not include_patterns and not exclude_patterns:
+        return True
+    return _filter_by_regexes(
+        name, _compile_patterns(tuple(include_patterns or ())), _compile_patterns(tuple(exclude_patterns or ()))
+    )
 
-    is_included = True
-    is_excluded = False
-    if include_patterns:
-        is_included = _is_a_pattern(include_patterns)
-    if exclude_patterns:
-        is_excluded = _is_a_pattern(exclude_patterns)
-    if is_excluded or not is_included:
+
+def _filter_by_regexes(
+    name: str, include_regex: typing.Optional[typing.Pattern[str]], exclude_regex: typing.Optional[typing.Pattern[str]]
+) -> bool:
+    if exclude_regex is not None and exclude_regex.match(name):
         return False
-    return True
+    return include_regex is None or include_regex.match(name) is not None
 
 
-def process_file(
-    file_path: str,
+def _is_function_def(ast_node: ast.stmt) -> bool:
+    return type(ast_node) in FUNCTION_DEF_TYPES
+
+
+def _process_module(
+    ast_module: ast.Module,
+    base_path: str,
     include_patterns: typing.Optional[typing.List[str]] = None,
     exclude_patterns: typing.Optional[typing.List[str]] = None,
 ) -> NameToSchemaMap:
-    with open(file_path) as f:
-        ast_body = ast.parse(f.read()).body
     name_to_schema_map = init_name_to_schema_map()
     typing_namespace = init_typing_namespace()
     function_schema_map = {}
 
-    def _process_function(ast_function_def: ast.FunctionDef):
-        if not filter_by_patterns(ast_function_def.name, include_patterns, exclude_patterns):
-            LOGGER.info(f"Function {ast_function_def.name} skipped")
+    include_regex = _compile_patterns(tuple(include_patterns or ()))
+    exclude_regex = _compile_patterns(tuple(exclude_patterns or ()))
+    for is_function_def, nodes in itertools.groupby(ast_module.body, _is_function_def):
+        if not is_function_def:
+            process_type_definitions(nodes, base_path, typing_namespace, name_to_schema_map)
         else:
-            function_schema_map[ast_function_def.name] = process_function_def(
-                ast_function_def, typing_namespace, name_to_schema_map
-            )
-
-    for node in ast_body:
-        node_type = type(node)
-        process_map = {
-            ast.Import: lambda: process_import(node, typing_namespace, name_to_schema_map),
-            ast.ImportFrom: lambda: process_import_from(
-                node, os.path.dirname(file_path), typing_namespace, name_to_schema_map
-            ),
-            ast.Assign: lambda: process_assign(node, typing_namespace, name_to_schema_map),
-            ast.ClassDef: lambda: process_class_def(node, typing_namespace, name_to_schema_map),
-            ast.FunctionDef: lambda: _process_function(node),
-        }
-        if node_type in process_map:
-            process_map[node_type]()
+            for node in nodes:
+                if not _filter_by_regexes(node.name, include_regex, exclude_regex):
+                    LOGGER.info(f"Function {node.name} skipped")
+                else:
+                    function_schema_map[node.name] = process_function_def(node, typing_namespace, name_to_schema_map)
     return function_schema_map
 
 
+def process_file(
+    file_path: str,
+    include_patterns: typing.Optional[typing.List[str]] = None,
+    exclude_patterns: typing.Optional[typing.List[str]] = None,
+) -> NameToSchemaMap:
+    return _process_module(parse_file(file_path), os.path.dirname(file_path), include_patterns, exclude_patterns)
+
+
+def process_source(
+    source: typing.Union[str, bytes],
+    include_patterns: typing.Optional[typing.List[str]] = None,
+    exclude_patterns: typing.Optional[typing.List[str]] = None,
+    base_path: str = os.curdir,
+) -> NameToSchemaMap:
+    # Relative imports in the source are resolved from base_path, the directory its module would live in
+    return _process_module(parse_source(source), base_path, include_patterns, exclude_patterns)
+
+
 def package_iterator(
     package_path: str,
     include_patterns: typing.Optional[typing.List[str]] = None,
     exclude_patterns: typing.Optional[typing.List[str]] = None,
     import_prefix: typing.Optional[str] = None,
 ) -> typing.Generator[typing.Tuple[str, str], None, None]:
+    # Modules are yielded depth first, in iter_modules order
+    include_regex = _compile_patterns(tuple(include_patterns or ()))
+    exclude_regex = _compile_patterns(tuple(exclude_patterns or ()))
     package_path = os.path.normpath(package_path)
     package_name = os.path.basename(package_path)
     if import_prefix is None:
@@ -149,40 +185,71 @@ def package_iterator(
     else:
         import_path = f"{import_prefix}.{package_name}"
     yield import_path, os.path.join(package_path, "__init__.py")
-    for child_module in pkgutil.iter_modules([package_path]):
-        if not filter_by_patterns(child_module.name, include_patterns, exclude_patterns):
-            LOGGER.info(f"Module {package_name}.{child_module.name} skipped")
-            continue
-        if not child_module.ispkg:
-            if import_prefix is None:
-                import_path = f"{package_name}.{child_module.name}"
+    pending_packages = [(package_path, import_path, pkgutil.iter_modules([package_path]))]
+    while pending_packages:
+        package_path, import_path, child_modules = pending_packages[-1]
+        for child_module in child_modules:
+            if not _filter_by_regexes(child_module.name, include_regex, exclude_regex):
+                LOGGER.info(f"Module {os.path.basename(package_path)}.{child_module.name} skipped")
+            elif not child_module.ispkg:
+                yield f"{import_path}.{child_module.name}", os.path.join(package_path, f"{child_module.name}.py")
             else:
-                import_path = f"{import_prefix}.{package_name}.{child_module.name}"
-            yield import_path, os.path.join(package_path, f"{child_module.name}.py")
+                subpackage_path = os.path.join(package_path, child_module.name)
+                subpackage_import_path = f"{import_path}.{child_module.name}"
+                yield subpackage_import_path, os.path.join(subpackage_path, "__init__.py")
+                pending_packages.append(
+                    (subpackage_path, subpackage_import_path, pkgutil.iter_modules([subpackage_path]))
+                )
+                break
         else:
-            if import_prefix is None:
-                new_prefix = package_name
-            else:
-                new_prefix = f"{import_prefix}.{package_name}"
-            for inner_import_path, inner_module_math in package_iterator(
-                os.path.join(package_path, child_module.name), include_patterns, exclude_patterns, new_prefix
-            ):
-                yield inner_import_path, inner_module_math
+            pending_packages.pop()
+
+
+def _read_files_ahead(
+    executor: concurrent.futures.Executor, file_paths: typing.List[str]
+) -> typing.Generator[typing.Tuple[str, typing.Tuple[os.stat_result, bytes]], None, None]:
+    # At most PREFETCH_READ_AHEAD files are read ahead of the one being processed
+    pending_reads = collections.deque()
+    for file_path in file_paths:
+        pending_reads.append((file_path, executor.submit(read_file, file_path)))
+        if len(pending_reads) > PREFETCH_READ_AHEAD:
+            pending_file_path, pending_read = pending_reads.popleft()
+            yield pending_file_path, pending_read.result()
+    for pending_file_path, pending_read in pending_reads:
+        yield pending_file_path, pending_read.result()
 
 
 def process_package(
     package_path: str,
     include_patterns: typing.Optional[typing.List[str]] = None,
     exclude_patterns: typing.Optional[typing.List[str]] = None,
+    max_workers: typing.Optional[int] = 1,
 ) -> NameToSchemaMap:
     function_schema_map = {}
-    for package_chain, package_file_path in package_iterator(package_path, include_patterns, exclude_patterns):
-        function_schema_map.update(
-            **{
-                f"{package_chain}.{func_name}": func_schema
-                for func_name, func_schema in process_file(
-                    package_file_path, include_patterns, exclude_patterns
-                ).items()
-            }
+    package_files = list(package_iterator(package_path, include_patterns, exclude_patterns))
+    package_file_paths = [package_file_path for _, package_file_path in package_files]
+    if max_workers == 1:
+        # Files are read ahead by a few threads, but parsed in this one, the only one using the parse cache
+        with concurrent.futures.ThreadPoolExecutor(PREFETCH_WORKERS) as executor:
+            file_schema_maps = [
+                _process_module(
+                    parse_file(package_file_path, file_contents),
+                    os.path.dirname(package_file_path),
+                    include_patterns,
+                    exclude_patterns,
+                )
+                for package_file_path, file_contents in _read_files_ahead(executor, package_file_paths)
+            ]
+    else:
+        process_package_file = functools.partial(
+            process_file, include_patterns=include_patterns, exclude_patterns=exclude_patterns
+        )
+        chunk_size = max(
+            1, len(package_file_paths) // (PROCESS_CHUNKS_PER_WORKER * (max_workers or os.cpu_count() or 1))
         )
+        with concurrent.futures.ProcessPoolExecutor(max_workers) as executor:
+            file_schema_maps = list(executor.map(process_package_file, package_file_paths, chunksize=chunk_size))
+    for (package_chain, _), file_schema_map in zip(package_files, file_schema_maps):
+        for func_name, func_schema in file_schema_map.items():
+            function_schema_map[f"{package_chain}.{func_name}"] = func_schema
     return function_schema_map
@@ -1,95 +1,128 @@
 import ast
+from typing import Optional
 
-from .annotations import AstAnnotationElement, LiteralValue, Schema, NameToSchemaMap, TypingNamespace
+from .annotations import (
+    AstAnnotationElement,
+    AstNameOrAttribute,
+    LiteralValue,
+    Schema,
+    SchemaMemo,
+    NameToSchemaMap,
+    TypingNamespace,
+)
 from .common import get_ast_name_or_attribute_string, InvalidTypeAnnotation, VALID_SUBSCRIPT_TYPES
 
 
+# Shared by every None annotation. Like the base name schemas, generated schemas are never mutated once built
+NULL_SCHEMA = {"type": "null"}
+
+_INVALID_SUBSCRIPT_TYPE_ERROR = (
+    f"Only valid subscript type annotations are {', '.join(sorted(VALID_SUBSCRIPT_TYPES))}. Are you missing an import?"
+)
+
+_LITERAL_VALUE_TYPES = (type(None), bool, str, int, float)
+
+
 def _validate_literal_value(ast_element: AstAnnotationElement) -> LiteralValue:
     if not isinstance(ast_element, ast.Constant):
         raise InvalidTypeAnnotation(ast_element, "Literal values must be constants")
-    elif not isinstance(ast_element.value, (type(None), bool, str, int, float)):
+    elif not isinstance(ast_element.value, _LITERAL_VALUE_TYPES):
         raise InvalidTypeAnnotation(ast_element, "Literal values must be either None, bool, str, int or float")
     return ast_element.value
 
 
+class _SchemaContext:
+    # State shared by every level of the recursive walk of an annotation
+    __slots__ = ("type_namespace", "schema_map", "memo")
+
+    def __init__(self, type_namespace: TypingNamespace, schema_map: NameToSchemaMap, memo: Optional[SchemaMemo]):
+        self.type_namespace = type_namespace
+        self.schema_map = schema_map
+        self.memo = memo
+
+
 def get_schema_from_ast_element(
     ast_element: AstAnnotationElement,
     type_namespace: TypingNamespace,
     schema_map: NameToSchemaMap,
+    memo: Optional[SchemaMemo] = None,
 ) -> Schema:
-    if isinstance(ast_element, ast.Constant):
-        if ast_element.value is None:
-            return {"type": "null"}
-        else:
-            raise InvalidTypeAnnotation(ast_element, "Only valid constant type annotation is the None value")
-    elif isinstance(ast_element, (ast.Name, ast.Attribute)):
-        element_string = get_ast_name_or_attribute_string(ast_element)
-        if element_string not in schema_map:
-            raise InvalidTypeAnnotation(
-                ast_element,
-                f"Only valid named type annotations are {', '.join(sorted(schema_map.keys()))}. "
-                f"Are you missing an import?",
-            )
-        return schema_map[element_string]
-    elif isinstance(ast_element, ast.Subscript):
-        # 1. Validate subscript type: Dict, List, Literal, Optional and Union
-        subscript_string = get_ast_name_or_attribute_string(ast_element.value)
-        for key in VALID_SUBSCRIPT_TYPES:
-            if subscript_string in type_namespace.get(key, {}):
-                subscript_type = key
-                break
+    # Callers translating the same parsed tree more than once can pass a memo, so every AST element is translated only
+    # once. Schemas are shared between the memo and its consumers
+    return _get_schema(ast_element, _SchemaContext(type_namespace, schema_map, memo))
+
+
+def _get_schema(ast_element: AstAnnotationElement, context: _SchemaContext) -> Schema:
+    if context.memo is not None and ast_element in context.memo:
+        return context.memo[ast_element]
+    schema_builder = _SCHEMA_BUILDERS.get(type(ast_element))
+    if schema_builder is None:
+        raise InvalidTypeAnnotation(ast_element, f"Invalid type annotation ast element '{str(type(ast_element))}'")
+    schema = schema_builder(ast_element, context)
+    if context.memo is not None:
+        context.memo[ast_element] = schema
+    return schema
+
+
+def _build_constant_schema(ast_element: ast.Constant, context: _SchemaContext) -> Schema:
+    if ast_element.value is None:
+        return NULL_SCHEMA
+    else:
+        raise InvalidTypeAnnotation(ast_element, "Only valid constant type annotation is the None value")
+
+
+def _build_name_or_attribute_schema(ast_element: AstNameOrAttribute, context: _SchemaContext) -> Schema:
+    element_string = get_ast_name_or_attribute_string(ast_element)
+    if element_string not in context.schema_map:
+        raise InvalidTypeAnnotation(
+            ast_element,
+            f"Only valid named type annotations are {', '.join(sorted(context.schema_map.keys()))}. "
+            f"Are you missing an import?",
+        )
+    return context.schema_map[element_string]
+
+
+def _build_subscript_schema(ast_element: ast.Subscript, context: _SchemaContext) -> Schema:
+    # 1. Validate subscript type: Dict, List, Literal, Optional and Union
+    if isinstance(ast_element.value, (ast.Name, ast.Attribute)):
+        subscript_type = context.type_namespace.get(get_ast_name_or_attribute_string(ast_element.value))
+    else:
+        subscript_type = None
+    if subscript_type not in VALID_SUBSCRIPT_TYPES:
+        raise InvalidTypeAnnotation(ast_element, _INVALID_SUBSCRIPT_TYPE_ERROR)
+    subscript_child = ast_element.slice.value
+    # 2.1. If subscript only has one child
+    if isinstance(subscript_child, (ast.Constant, ast.Name, ast.Attribute, ast.Subscript)):
+        if subscript_type == "List":
+            return {"type": "array", "items": _get_schema(subscript_child, context)}
+        elif subscript_type == "Literal":
+            return {"enum": [_validate_literal_value(subscript_child)]}
+        elif subscript_type == "Optional":
+            return {"anyOf": [_get_schema(subscript_child, context), NULL_SCHEMA]}
+        elif subscript_type == "Union":
+            return {"anyOf": [_get_schema(subscript_child, context)]}
         else:
-            raise InvalidTypeAnnotation(
-                ast_element,
-                f"Only valid subscript type annotations are {', '.join(sorted(list(VALID_SUBSCRIPT_TYPES)))}. "
-                f"Are you missing an import?",
-            )
-        # 2.1. If subscript only has one child
-        if isinstance(ast_element.slice.value, (ast.Constant, ast.Name, ast.Attribute, ast.Subscript)):
-            if subscript_type == "List":
-                return {
-                    "type": "array",
-                    "items": get_schema_from_ast_element(ast_element.slice.value, type_namespace, schema_map),
-                }
-            elif subscript_type == "Literal":
-                return {"enum": [_validate_literal_value(ast_element.slice.value)]}
-            elif subscript_type == "Optional":
-                return {
-                    "anyOf": [
-                        get_schema_from_ast_element(ast_element.slice.value, type_namespace, schema_map),
-                        {"type": "null"},
-                    ]
-                }
-            elif subscript_type == "Union":
-                return {"anyOf": [get_schema_from_ast_element(ast_element.slice.value, type_namespace, schema_map)]}
-            else:
-                raise InvalidTypeAnnotation(ast_element, f"{subscript_type} must contain more than one element")
-        # 2.1. If subscript has multiple children
-        elif isinstance(ast_element.slice.value, ast.Tuple):
-            if subscript_type == "Dict":
-                if not (
-                    isinstance(ast_element.slice.value.elts[0], ast.Name)
-                    and ast_element.slice.value.elts[0].id == "str"
-                ):
-                    raise InvalidTypeAnnotation(ast_element, "Dict keys must be strings")
-                return {
-                    "type": "object",
-                    "additionalProperties": get_schema_from_ast_element(
-                        ast_element.slice.value.elts[1], type_namespace, schema_map
-                    ),
-                }
-            elif subscript_type == "Literal":
-                return {"enum": [_validate_literal_value(element) for element in ast_element.slice.value.elts]}
-            elif subscript_type == "Union":
-                return {
-                    "anyOf": [
-                        get_schema_from_ast_element(element, type_namespace, schema_map)
-                        for element in ast_element.slice.value.elts
-                    ]
-                }
-            else:
-                raise InvalidTypeAnnotation(ast_element, f"{subscript_type} must not contain more than one element")
+            raise InvalidTypeAnnotation(ast_element, f"{subscript_type} must contain more than one element")
+    # 2.1. If subscript has multiple children
+    elif isinstance(subscript_child, ast.Tuple):
+        subscript_elements = subscript_child.elts
+        if subscript_type == "Dict":
+            if not (isinstance(subscript_elements[0], ast.Name) and subscript_elements[0].id == "str"):
+                raise InvalidTypeAnnotation(ast_element, "Dict keys must be strings")
+            return {"type": "object", "additionalProperties": _get_schema(subscript_elements[1], context)}
+        elif subscript_type == "Literal":
+            return {"enum": [_validate_literal_value(element) for element in subscript_elements]}
+        elif subscript_type == "Union":
+            return {"anyOf": [_get_schema(element, context) for element in subscript_elements]}
         else:
-            raise InvalidTypeAnnotation(ast_element, f"Invalid subscript child ast element '{str(type(ast_element))}'")
+            raise InvalidTypeAnnotation(ast_element, f"{subscript_type} must not contain more than one element")
     else:
-        raise InvalidTypeAnnotation(ast_element, f"Invalid type annotation ast element '{str(type(ast_element))}'")
+        raise InvalidTypeAnnotation(ast_element, f"Invalid subscript child ast element '{str(type(ast_element))}'")
+
+
+_SCHEMA_BUILDERS = {
+    ast.Constant: _build_constant_schema,
+    ast.Name: _build_name_or_attribute_schema,
+    ast.Attribute: _build_name_or_attribute_schema,
+    ast.Subscript: _build_subscript_schema,
+}
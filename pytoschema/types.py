@@ -1,28 +1,34 @@
 import ast
+import itertools
 import os
+import sys
+from typing import Iterable, Iterator, List, Optional
 
 from .annotations import NameToSchemaMap, TypingNamespace
 from .common import (
+    BASE_NAME_TO_SCHEMA_MAP,
     get_ast_name_or_attribute_string,
     init_name_to_schema_map,
     init_typing_namespace,
+    parse_file,
     VALID_SUBSCRIPT_TYPES,
     VALID_TYPES,
 )
-from .jsonschema import get_schema_from_ast_element
+from .jsonschema import get_schema_from_ast_element, NULL_SCHEMA
 
 
 ANY_SCHEMA = {
     "anyOf": [
         {"type": "object"},
         {"type": "array"},
-        {"type": "null"},
-        {"type": "string"},
-        {"type": "boolean"},
-        {"type": "integer"},
-        {"type": "number"},
+        NULL_SCHEMA,
+        BASE_NAME_TO_SCHEMA_MAP["str"],
+        BASE_NAME_TO_SCHEMA_MAP["bool"],
+        BASE_NAME_TO_SCHEMA_MAP["int"],
+        BASE_NAME_TO_SCHEMA_MAP["float"],
     ]
 }
+_VALID_TYPES = tuple(sorted(VALID_TYPES))
 
 
 def process_alias(ast_alias: ast.alias) -> str:
@@ -34,13 +40,117 @@ def process_alias(ast_alias: ast.alias) -> str:
 
 def process_import(ast_import: ast.Import, typing_namespace: TypingNamespace, name_to_schema_map: NameToSchemaMap):
     for import_name in ast_import.names:
-        module_element = process_alias(import_name)
         if import_name.name == "typing":
-            for valid_type in VALID_TYPES:
-                element = f"{module_element}.{valid_type}"
-                typing_namespace[valid_type].add(element)
-                if valid_type == "Any":
-                    name_to_schema_map[element] = ANY_SCHEMA
+            module_element = process_alias(import_name)
+            typing_namespace.update(
+                (sys.intern(f"{module_element}.{valid_type}"), valid_type) for valid_type in _VALID_TYPES
+            )
+            name_to_schema_map[sys.intern(f"{module_element}.Any")] = ANY_SCHEMA
+
+
+def _get_referenced_names(ast_node: ast.stmt) -> Iterator[str]:
+    # Only the parts the type definition processors read are walked. Class bodies in particular are never descended
+    # into beyond their annotations, so method bodies are skipped
+    if isinstance(ast_node, ast.ClassDef):
+        ast_elements = [
+            *ast_node.bases,
+            *(keyword.value for keyword in ast_node.keywords),
+            *(node.annotation for node in ast_node.body if isinstance(node, ast.AnnAssign)),
+        ]
+    elif isinstance(ast_node, ast.Assign):
+        ast_elements = [ast_node.value]
+    else:
+        ast_elements = []
+    for ast_element in ast_elements:
+        for child in ast.walk(ast_element):
+            if isinstance(child, ast.Name):
+                yield child.id
+
+
+def _get_required_type_definitions(ast_module: ast.Module, names: Iterable[str]) -> List[ast.stmt]:
+    # Only the nodes defining the imported names, and transitively the names they reference, need processing. Other
+    # relative imports in particular are never followed. Plain imports are always kept, they are cheap to process
+    definitions = {}
+    for node in ast_module.body:
+        if isinstance(node, ast.ImportFrom) and node.level > 0:
+            defined_names = [import_name.name for import_name in node.names]
+        elif isinstance(node, ast.Assign):
+            defined_names = [target.id for target in node.targets if isinstance(target, ast.Name)]
+        elif isinstance(node, ast.ClassDef):
+            defined_names = [node.name]
+        else:
+            defined_names = []
+        for name in defined_names:
+            definitions.setdefault(name, []).append(node)
+    required_nodes = set()
+    pending_names = list(names)
+    while pending_names:
+        for node in definitions.pop(pending_names.pop(), []):
+            if id(node) not in required_nodes:
+                required_nodes.add(id(node))
+                pending_names.extend(_get_referenced_names(node))
+    return [
+        node
+        for node in ast_module.body
+        if id(node) in required_nodes or isinstance(node, ast.Import) or getattr(node, "level", None) == 0
+    ]
+
+
+def _process_relative_module(
+    module: Optional[str], level: int, names: Iterable[str], base_path: str
+) -> NameToSchemaMap:
+    module_file = f"{module}.py" if module else "__init__.py"
+    new_base_path = base_path
+    for _ in range(level - 1):
+        new_base_path = os.path.join(new_base_path, os.pardir)
+    ast_module = parse_file(os.path.join(new_base_path, module_file))
+    new_typing_namespace = init_typing_namespace()
+    new_name_to_schema_map = init_name_to_schema_map()
+    process_type_definitions(
+        _get_required_type_definitions(ast_module, names),
+        new_base_path,
+        new_typing_namespace,
+        new_name_to_schema_map,
+    )
+    return new_name_to_schema_map
+
+
+def process_import_froms(
+    ast_import_froms: List[ast.ImportFrom],
+    base_path: str,
+    typing_namespace: TypingNamespace,
+    name_to_schema_map: NameToSchemaMap,
+):
+    # Relative imports of the same module are grouped, so the module is walked once for all the names they import
+    relative_module_names = {}
+    for ast_import_from in ast_import_froms:
+        if ast_import_from.level > 0:
+            relative_module_names.setdefault((ast_import_from.module, ast_import_from.level), []).extend(
+                import_name.name for import_name in ast_import_from.names
+            )
+    relative_module_maps = {
+        (module, level): _process_relative_module(module, level, names, base_path)
+        for (module, level), names in relative_module_names.items()
+    }
+    # Imported names are still bound in statement order, so a name imported twice keeps its last definition
+    for ast_import_from in ast_import_froms:
+        # Level == 0 are absolute imports. We only follow the ones that targets typing
+        if ast_import_from.level == 0:
+            for import_name in ast_import_from.names:
+                element = process_alias(import_name)
+                if ast_import_from.module == "typing":
+                    if import_name.name in VALID_TYPES:
+                        typing_namespace[element] = import_name.name
+                        if import_name.name == "Any":
+                            name_to_schema_map[element] = ANY_SCHEMA
+        # Level >= 1 are relative imports. 1 is the current directory, 2 the parent, 3 the grandparent, and so on.
+        else:
+            new_name_to_schema_map = relative_module_maps[(ast_import_from.module, ast_import_from.level)]
+            for import_name in ast_import_from.names:
+                item = new_name_to_schema_map.get(import_name.name)
+                # Import could be something we didn't care about and hence didn't put in name_to_schema_map
+                if item is not None:
+                    name_to_schema_map[import_name.name] = item
 
 
 def process_import_from(
@@ -49,48 +159,17 @@ def process_import_from(
     typing_namespace: TypingNamespace,
     name_to_schema_map: NameToSchemaMap,
 ):
-    # Level == 0 are absolute imports. We only follow the ones that targets typing
-    if ast_import_from.level == 0:
-        for import_name in ast_import_from.names:
-            element = process_alias(import_name)
-            if ast_import_from.module == "typing":
-                if import_name.name in VALID_TYPES:
-                    typing_namespace[import_name.name].add(element)
-                    if import_name.name == "Any":
-                        name_to_schema_map[element] = ANY_SCHEMA
-    # Level >= 1 are relative imports. 1 is the current directory, 2 the parent, 3 the grandparent, and so on.
-    else:
-        module = f"{ast_import_from.module}.py" if ast_import_from.module else "__init__.py"
-        new_base_path = base_path
-        for _ in range(ast_import_from.level - 1):
-            new_base_path = os.path.join(new_base_path, os.pardir)
-        path = os.path.join(new_base_path, module)
-        with open(path) as f:
-            ast_module = ast.parse(f.read())
-        new_typing_namespace = init_typing_namespace()
-        new_name_to_schema_map = init_name_to_schema_map()
-        for node in ast_module.body:
-            if isinstance(node, ast.Import):
-                process_import(node, new_typing_namespace, new_name_to_schema_map)
-            elif isinstance(node, ast.ImportFrom):
-                process_import_from(node, new_base_path, new_typing_namespace, new_name_to_schema_map)
-            elif isinstance(node, ast.Assign) and node.targets[0].id:
-                process_assign(node, new_typing_namespace, new_name_to_schema_map)
-            elif isinstance(node, ast.ClassDef) and node.name:
-                process_class_def(node, new_typing_namespace, new_name_to_schema_map)
-        for import_name in ast_import_from.names:
-            item = new_name_to_schema_map.get(import_name.name)
-            # Import could be something we didn't care about and hence didn't put in name_to_schema_map
-            if item is not None:
-                name_to_schema_map[import_name.name] = item
+    process_import_froms([ast_import_from], base_path, typing_namespace, name_to_schema_map)
 
 
 def process_class_def(
-    ast_class_def: ast.ClassDef, typing_namespace: TypingNamespace, name_to_schema_map: NameToSchemaMap
+    ast_class_def: ast.ClassDef,
+    typing_namespace: TypingNamespace,
+    name_to_schema_map: NameToSchemaMap,
 ):
     # This supports TypedDict class syntax
     if ast_class_def.bases:
-        if get_ast_name_or_attribute_string(ast_class_def.bases[0]) in typing_namespace.get("TypedDict", set()):
+        if typing_namespace.get(get_ast_name_or_attribute_string(ast_class_def.bases[0])) == "TypedDict":
             properties = {}
             required = []
             all_properties_required = True
@@ -116,17 +195,69 @@ def process_class_def(
             }
 
 
-def process_assign(ast_assign: ast.Assign, typing_namespace: TypingNamespace, name_to_schema_map: NameToSchemaMap):
+def process_assign(
+    ast_assign: ast.Assign,
+    typing_namespace: TypingNamespace,
+    name_to_schema_map: NameToSchemaMap,
+):
+    # Only type aliases like "a = typing.List[str]" are processed
     if (
         isinstance(ast_assign.targets[0], ast.Name)
         and isinstance(ast_assign.value, ast.Subscript)
-        and get_ast_name_or_attribute_string(ast_assign.value.value)
-        in (
-            item
-            for values in (typing_namespace[subscript_type] for subscript_type in VALID_SUBSCRIPT_TYPES)
-            for item in values
-        )
+        and isinstance(ast_assign.value.value, (ast.Name, ast.Attribute))
+        and typing_namespace.get(get_ast_name_or_attribute_string(ast_assign.value.value)) in VALID_SUBSCRIPT_TYPES
     ):
         name_to_schema_map[ast_assign.targets[0].id] = get_schema_from_ast_element(
             ast_assign.value, typing_namespace, name_to_schema_map
         )
+
+
+def _process_import_node(
+    ast_import: ast.Import,
+    base_path: str,
+    typing_namespace: TypingNamespace,
+    name_to_schema_map: NameToSchemaMap,
+):
+    process_import(ast_import, typing_namespace, name_to_schema_map)
+
+
+def _process_assign_node(
+    ast_assign: ast.Assign,
+    base_path: str,
+    typing_namespace: TypingNamespace,
+    name_to_schema_map: NameToSchemaMap,
+):
+    process_assign(ast_assign, typing_namespace, name_to_schema_map)
+
+
+def _process_class_def_node(
+    ast_class_def: ast.ClassDef,
+    base_path: str,
+    typing_namespace: TypingNamespace,
+    name_to_schema_map: NameToSchemaMap,
+):
+    process_class_def(ast_class_def, typing_namespace, name_to_schema_map)
+
+
+TYPE_DEFINITION_PROCESSORS = {
+    ast.Import: _process_import_node,
+    ast.Assign: _process_assign_node,
+    ast.ClassDef: _process_class_def_node,
+}
+
+
+def process_type_definitions(
+    ast_nodes: Iterable[ast.stmt],
+    base_path: str,
+    typing_namespace: TypingNamespace,
+    name_to_schema_map: NameToSchemaMap,
+):
+    # Consecutive "from ... import ..." statements are processed together, see process_import_froms
+    for node_type, nodes in itertools.groupby(ast_nodes, type):
+        if node_type is ast.ImportFrom:
+            process_import_froms(list(nodes), base_path, typing_namespace, name_to_schema_map)
+        else:
+            processor = TYPE_DEFINITION_PROCESSORS.get(node_type)
+            if processor is not None:
+                for node in nodes:
+                    processor(node, base_path, typing_namespace, name_to_schema_map)
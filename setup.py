@@ -23,6 +23,7 @@ setup(
     maintainer_email="carlos.ruiz.lantero@comprehensivetech.co.uk",
     url="https://github.com/comprehensivetech/pytoschema",
     packages=["pytoschema"],
+    python_requires=">=3.8",
     classifiers=[
         "Operating System :: OS Independent",
         "Programming Language :: Python",
@@ -1,30 +1,60 @@
 import ast
-from typing import Any, Callable
+import functools
+from types import MappingProxyType
+from typing import Any, Callable, List
 
 import pytest
 
-from pytoschema.annotations import AstAnnotationElement
+from pytoschema.annotations import AstAnnotationElement, Schema
 
 
-TEST_TYPING_NAMESPACE = {
-    "Any": {"typing.Any"},
-    "Dict": {"typing.Dict"},
-    "List": {"typing.List"},
-    "Literal": {"typing.Literal"},
-    "Optional": {"typing.Optional"},
-    "TypedDict": {"typing.TypedDict"},
-    "Union": {"typing.Union"},
-}
+# Spelled out rather than imported, so a wrong draft in the library fails the tests
+TEST_JSON_SCHEMA_DRAFT = "http://json-schema.org/draft-07/schema#"
 
+# Read-only, as the same namespace is shared by every test using it
+TEST_TYPING_NAMESPACE = MappingProxyType(
+    {
+        "typing.Any": "Any",
+        "typing.Dict": "Dict",
+        "typing.List": "List",
+        "typing.Literal": "Literal",
+        "typing.Optional": "Optional",
+        "typing.TypedDict": "TypedDict",
+        "typing.Union": "Union",
+    }
+)
 
+
+# Cached, so the same source used for a test input and its expected exception is parsed only once, into the same node
+@functools.lru_cache(maxsize=None)
 def build_ast_annotation_element(text: str) -> AstAnnotationElement:
     return ast.parse(text).body[0].value
 
 
+@functools.lru_cache(maxsize=None)
+def build_ast_function_def(text: str) -> ast.FunctionDef:
+    return ast.parse(text).body[0]
+
+
+def build_function_schema(
+    properties: Schema, required: List[str], output: Schema, additional_properties: Any = False
+) -> Schema:
+    return {
+        "input": {
+            "$schema": TEST_JSON_SCHEMA_DRAFT,
+            "type": "object",
+            "properties": properties,
+            "required": required,
+            "additionalProperties": additional_properties,
+        },
+        "output": dict({"$schema": TEST_JSON_SCHEMA_DRAFT}, **output),
+    }
+
+
 def assert_expected_value_or_exception(callback: Callable, expected: Any):
-    if isinstance(expected, Exception):
+    if isinstance(expected, BaseException):
         with pytest.raises(expected.__class__) as exception:
             callback()
-        assert str(exception.value) == str(expected)
+        assert exception.value.args == expected.args
     else:
         assert callback() == expected
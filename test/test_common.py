@@ -1,29 +1,37 @@
+import ast
+import os
+import pickle
+import sys
+import tempfile
+
 import pytest
 
 from pytoschema.annotations import AstNameOrAttribute, AstAnnotationElement
 from pytoschema.common import (
+    BASE_NAME_TO_SCHEMA_MAP,
+    clear_parse_cache,
     init_typing_namespace,
     init_name_to_schema_map,
     get_ast_name_or_attribute_string,
     InvalidTypeAnnotation,
+    parse_file,
+    parse_source,
 )
 
 from .conftest import build_ast_annotation_element
 
 
 def test_init_typing_namespace():
-    assert init_typing_namespace() == {
-        "Any": set(),
-        "Dict": set(),
-        "List": set(),
-        "Literal": set(),
-        "Optional": set(),
-        "TypedDict": set(),
-        "Union": set(),
-    }
+    assert init_typing_namespace() == {}
 
 
 def test_init_name_to_schema_map():
+    name_to_schema_map = init_name_to_schema_map()
+    name_to_schema_map["foo"] = {"type": "null"}
+    assert type(name_to_schema_map) is dict
+    assert "foo" not in BASE_NAME_TO_SCHEMA_MAP
+    with pytest.raises(TypeError):
+        BASE_NAME_TO_SCHEMA_MAP["foo"] = {"type": "null"}
     assert init_name_to_schema_map() == {
         "bool": {"type": "boolean"},
         "float": {"type": "number"},
@@ -44,6 +52,7 @@ def test_init_name_to_schema_map():
 )
 def test_get_ast_attribute_string(ast_element: AstNameOrAttribute, expected: str):
     assert get_ast_name_or_attribute_string(ast_element) == expected
+    assert get_ast_name_or_attribute_string(ast_element) is sys.intern(expected)
 
 
 @pytest.mark.parametrize(
@@ -62,3 +71,36 @@ def test_get_ast_attribute_string(ast_element: AstNameOrAttribute, expected: str
 )
 def test_invalid_type_annotation(ast_element: AstAnnotationElement, expected: str):
     assert str(InvalidTypeAnnotation(ast_element, "test reason")) == expected
+    assert str(pickle.loads(pickle.dumps(InvalidTypeAnnotation(ast_element, "test reason")))) == expected
+
+
+def test_parse_file():
+    with tempfile.TemporaryDirectory() as package:
+        module = os.path.join(package, "module.py")
+        with open(module, "w") as f:
+            f.write("a = 1\n")
+        os.utime(module, (1, 1))
+        ast_module = parse_file(module)
+        assert isinstance(ast_module, ast.Module)
+        assert parse_file(os.path.join(package, os.curdir, "module.py")) is ast_module
+        with open(module, "w") as f:
+            f.write("a = 1\nb = 2\n")
+        os.utime(module, (2, 2))
+        assert len(parse_file(module).body) == 2
+        with open(module, "wb") as f:
+            f.write("# -*- coding: latin-1 -*-\na = 'ñ'\n".encode("latin-1"))
+        os.utime(module, (3, 3))
+        assert parse_file(module).body[0].value.value == "ñ"
+        os.utime(module, (4, 4))
+        assert parse_file(module, (os.stat(module), b"b = 2\n")).body[0].targets[0].id == "b"
+        ast_module = parse_file(module)
+        assert ast_module.body[0].targets[0].id == "b"
+        clear_parse_cache()
+        assert parse_file(module) is not ast_module
+
+
+def test_parse_source():
+    ast_module = parse_source("a = 1  # type: int\n", "module.py")
+    assert isinstance(ast_module, ast.Module)
+    assert ast_module.body[0].type_comment is None
+    assert parse_source(b"a = 1\n").body[0].value.value == 1
@@ -1,109 +1,90 @@
 import ast
 import functools
 import os
-import tempfile
 from typing import List, Optional
 
 import pytest
 
 from pytoschema.annotations import Schema
+from pytoschema import functions
 from pytoschema.common import init_name_to_schema_map, InvalidTypeAnnotation
-from pytoschema.functions import filter_by_patterns, process_function_def, process_file, process_package
+from pytoschema.functions import (
+    filter_by_patterns,
+    package_iterator,
+    process_function_def,
+    process_file,
+    process_package,
+    process_source,
+)
+
+from .conftest import (
+    assert_expected_value_or_exception,
+    build_ast_function_def,
+    build_function_schema,
+    TEST_TYPING_NAMESPACE,
+)
+
 
-from .conftest import assert_expected_value_or_exception, TEST_TYPING_NAMESPACE
+EXAMPLE_PATH = os.path.join(os.path.dirname(__file__), "example")
 
 
 @pytest.mark.parametrize(
     ["ast_function_def", "expected"],
     [
         [
-            ast.parse("def foo(a, /): pass").body[0],
+            build_ast_function_def("def foo(a, /): pass"),
             InvalidTypeAnnotation(
-                ast.parse("def foo(a, /): pass").body[0], "Function 'foo' contains positional only arguments"
+                build_ast_function_def("def foo(a, /): pass"), "Function 'foo' contains positional only arguments"
             ),
         ],
         [
-            ast.parse("def foo(a, *args): pass").body[0],
+            build_ast_function_def("def foo(a, *args): pass"),
             InvalidTypeAnnotation(
-                ast.parse("def foo(a, *args): pass").body[0],
+                build_ast_function_def("def foo(a, *args): pass"),
                 "Function 'foo' contains a variable number positional arguments i.e. *args",
             ),
         ],
         [
-            ast.parse("def foo(**bar): pass").body[0],
+            build_ast_function_def("def foo(**bar): pass"),
             InvalidTypeAnnotation(
-                ast.parse("def foo(**bar): pass").body[0], "Function 'foo' is missing its **bar type annotation"
+                build_ast_function_def("def foo(**bar): pass"), "Function 'foo' is missing its **bar type annotation"
             ),
         ],
         [
-            ast.parse("def foo(**bar: int): pass").body[0],
-            {
-                "input": {
-                    "$schema": "http://json-schema.org/draft-07/schema#",
-                    "type": "object",
-                    "properties": {},
-                    "required": [],
-                    "additionalProperties": {"type": "integer"},
-                },
-                "output": {
-                    "$schema": "http://json-schema.org/draft-07/schema#",
-                    "type": "null",
-                },
-            },
+            build_ast_function_def("def foo(**bar: int): pass"),
+            build_function_schema({}, [], {"type": "null"}, {"type": "integer"}),
         ],
         [
-            ast.parse("def foo(a): pass").body[0],
+            build_ast_function_def("def foo(a): pass"),
             InvalidTypeAnnotation(
-                ast.parse("def foo(a): pass").body[0], "Function 'foo' is missing type annotation for the parameter 'a'"
+                build_ast_function_def("def foo(a): pass"),
+                "Function 'foo' is missing type annotation for the parameter 'a'",
             ),
         ],
         [
-            ast.parse("def foo(a: int = 3): pass").body[0],
-            {
-                "input": {
-                    "$schema": "http://json-schema.org/draft-07/schema#",
-                    "type": "object",
-                    "properties": {"a": {"type": "integer"}},
-                    "required": [],
-                    "additionalProperties": False,
-                },
-                "output": {
-                    "$schema": "http://json-schema.org/draft-07/schema#",
-                    "type": "null",
-                },
-            },
+            build_ast_function_def("def foo(a: int = 3): pass"),
+            build_function_schema({"a": {"type": "integer"}}, [], {"type": "null"}),
         ],
         [
-            ast.parse("def foo(a: int): pass").body[0],
-            {
-                "input": {
-                    "$schema": "http://json-schema.org/draft-07/schema#",
-                    "type": "object",
-                    "properties": {"a": {"type": "integer"}},
-                    "required": ["a"],
-                    "additionalProperties": False,
-                },
-                "output": {
-                    "$schema": "http://json-schema.org/draft-07/schema#",
-                    "type": "null",
-                },
-            },
+            build_ast_function_def("def foo(a: int): pass"),
+            build_function_schema({"a": {"type": "integer"}}, ["a"], {"type": "null"}),
         ],
         [
-            ast.parse("def foo() -> int: pass").body[0],
-            {
-                "input": {
-                    "$schema": "http://json-schema.org/draft-07/schema#",
-                    "type": "object",
-                    "properties": {},
-                    "required": [],
-                    "additionalProperties": False,
-                },
-                "output": {
-                    "$schema": "http://json-schema.org/draft-07/schema#",
-                    "type": "integer",
+            build_ast_function_def("def foo(a: int, b: str = 'b', *, c: bool = True, d: float): pass"),
+            build_function_schema(
+                {
+                    "a": {"type": "integer"},
+                    "b": {"type": "string"},
+                    "c": {"type": "boolean"},
+                    "d": {"type": "number"},
                 },
-            },
+                ["a", "d"],
+                {"type": "null"},
+            ),
+        ],
+        [
+            build_ast_function_def("def foo() -> int: pass"),
+            build_function_schema({}, [], {"type": "integer"}),
         ],
     ],
     ids=[
@@ -114,6 +95,7 @@ from .conftest import assert_expected_value_or_exception, TEST_TYPING_NAMESPACE
         "missing_arg",
         "arg_default",
         "arg_no_default",
+        "mixed_defaults",
         "return",
     ],
 )
@@ -134,6 +116,9 @@ def test_process_function_def(ast_function_def: ast.FunctionDef, expected: Schem
         ["foo", None, ["foo*"], False],
         ["foo", ["foo*"], ["bar*"], True],
         ["foo", ["foo*"], ["foo*"], False],
+        ["foo", ["bar*", "f?o"], None, True],
+        ["foo", None, ["bar*", "[ef]oo"], False],
+        ["foo", [], [], True],
     ],
     ids=[
         "no_patterns",
@@ -143,6 +128,9 @@ def test_process_function_def(ast_function_def: ast.FunctionDef, expected: Schem
         "exclude_finds",
         "exclude_override_miss",
         "exclude_override_finds",
+        "include_multiple_finds",
+        "exclude_multiple_finds",
+        "empty_patterns",
     ],
 )
 def test_filter_by_patterns(
@@ -151,133 +139,110 @@ def test_filter_by_patterns(
     assert filter_by_patterns(name, include_patterns, exclude_patterns) == expected
 
 
+def test_process_source():
+    assert process_source(
+        "import typing\n\n\ndef foo(a: int): pass\n\n\ndef bar(b: int): pass\n\n\n"
+        "async def baz() -> int: pass\n\n\neval(3)",
+        None,
+        ["bar*"],
+    ) == {
+        "foo": build_function_schema({"a": {"type": "integer"}}, ["a"], {"type": "null"}),
+        "baz": build_function_schema({}, [], {"type": "integer"}),
+    }
+    assert process_source(
+        "from .types import ServicePort\n\n\ndef foo(a: ServicePort): pass", base_path=EXAMPLE_PATH
+    ) == {
+        "foo": build_function_schema(
+            {"a": {"anyOf": [{"type": "integer"}, {"type": "number"}]}}, ["a"], {"type": "null"}
+        ),
+    }
+
+
 def test_process_file():
-    with tempfile.NamedTemporaryFile("w") as f:
-        f.write("import typing\n\n\ndef foo(a: int): pass\n\n\ndef bar(b: int): pass\n\n\neval(3)")
-        f.flush()
-        assert process_file(f.name, None, ["bar*"]) == {
-            "foo": {
-                "input": {
-                    "$schema": "http://json-schema.org/draft-07/schema#",
-                    "type": "object",
-                    "properties": {"a": {"type": "integer"}},
-                    "required": ["a"],
-                    "additionalProperties": False,
-                },
-                "output": {
-                    "$schema": "http://json-schema.org/draft-07/schema#",
-                    "type": "null",
-                },
-            }
-        }
+    assert process_file(os.path.join(EXAMPLE_PATH, "service.py"), exclude_patterns=["start"]) == {
+        "_secret": build_function_schema(
+            {"secret": {"anyOf": [{"type": "string"}, {"type": "null"}]}}, [], {"type": "null"}
+        ),
+    }
 
 
-def test_process_package():
+def test_package_iterator():
+    assert list(package_iterator(EXAMPLE_PATH)) == [
+        ("example", os.path.join(EXAMPLE_PATH, "__init__.py")),
+        ("example.config", os.path.join(EXAMPLE_PATH, "config", "__init__.py")),
+        ("example.config.dev", os.path.join(EXAMPLE_PATH, "config", "dev", "__init__.py")),
+        ("example.config.dev.common", os.path.join(EXAMPLE_PATH, "config", "dev", "common.py")),
+        ("example.config.prod", os.path.join(EXAMPLE_PATH, "config", "prod", "__init__.py")),
+        ("example.config.prod.common", os.path.join(EXAMPLE_PATH, "config", "prod", "common.py")),
+        ("example.service", os.path.join(EXAMPLE_PATH, "service.py")),
+        ("example.types", os.path.join(EXAMPLE_PATH, "types.py")),
+    ]
+    assert [import_path for import_path, _ in package_iterator(EXAMPLE_PATH, exclude_patterns=["dev", "s*"])] == [
+        "example",
+        "example.config",
+        "example.config.prod",
+        "example.config.prod.common",
+        "example.types",
+    ]
+    assert next(package_iterator(EXAMPLE_PATH, import_prefix="test")) == (
+        "test.example",
+        os.path.join(EXAMPLE_PATH, "__init__.py"),
+    )
+
+
+def test_process_package(monkeypatch):
+    get_config_schema = build_function_schema({}, [], {"type": "object", "additionalProperties": {"type": "string"}})
     init_schema = {
-        "example.version": {
-            "input": {
-                "$schema": "http://json-schema.org/draft-07/schema#",
-                "additionalProperties": False,
-                "properties": {},
-                "required": [],
-                "type": "object",
-            },
-            "output": {
-                "$schema": "http://json-schema.org/draft-07/schema#",
-                "type": "string",
-            },
-        },
-        "example.config.dev.common.get_config": {
-            "input": {
-                "$schema": "http://json-schema.org/draft-07/schema#",
-                "additionalProperties": False,
-                "properties": {},
-                "required": [],
-                "type": "object",
-            },
-            "output": {
-                "$schema": "http://json-schema.org/draft-07/schema#",
-                "additionalProperties": {
-                    "type": "string",
-                },
-                "type": "object",
-            },
-        },
-        "example.config.prod.common.get_config": {
-            "input": {
-                "$schema": "http://json-schema.org/draft-07/schema#",
-                "additionalProperties": False,
-                "properties": {},
-                "required": [],
-                "type": "object",
-            },
-            "output": {
-                "$schema": "http://json-schema.org/draft-07/schema#",
-                "additionalProperties": {
-                    "type": "string",
-                },
-                "type": "object",
-            },
-        },
+        "example.version": build_function_schema({}, [], {"type": "string"}),
+        "example.config.dev.common.get_config": get_config_schema,
+        "example.config.prod.common.get_config": get_config_schema,
     }
     expected = {
-        "example.service.start": {
-            "input": {
-                "$schema": "http://json-schema.org/draft-07/schema#",
-                "additionalProperties": False,
-                "properties": {
-                    "service": {
-                        "additionalProperties": False,
-                        "properties": {
-                            "address": {"type": "string"},
-                            "config": {
-                                "additionalProperties": {
-                                    "anyOf": [
-                                        {"type": "object"},
-                                        {"type": "array"},
-                                        {"type": "null"},
-                                        {"type": "string"},
-                                        {"type": "boolean"},
-                                        {"type": "integer"},
-                                        {"type": "number"},
-                                    ]
-                                },
-                                "type": "object",
+        "example.service.start": build_function_schema(
+            {
+                "service": {
+                    "additionalProperties": False,
+                    "properties": {
+                        "address": {"type": "string"},
+                        "config": {
+                            "additionalProperties": {
+                                "anyOf": [
+                                    {"type": "object"},
+                                    {"type": "array"},
+                                    {"type": "null"},
+                                    {"type": "string"},
+                                    {"type": "boolean"},
+                                    {"type": "integer"},
+                                    {"type": "number"},
+                                ]
                             },
-                            "state": {"enum": ["RUNNING", "STOPPED", "UNKNOWN"]},
-                            "debug": {"type": "boolean"},
-                            "port": {"anyOf": [{"type": "integer"}, {"type": "number"}]},
-                            "tags": {"items": {"type": "string"}, "type": "array"},
+                            "type": "object",
                         },
-                        "required": [],
-                        "type": "object",
-                    }
-                },
-                "required": ["service"],
-                "type": "object",
-            },
-            "output": {
-                "$schema": "http://json-schema.org/draft-07/schema#",
-                "type": "null",
-            },
-        },
-        "example.service._secret": {
-            "input": {
-                "$schema": "http://json-schema.org/draft-07/schema#",
-                "additionalProperties": False,
-                "properties": {"secret": {"anyOf": [{"type": "string"}, {"type": "null"}]}},
-                "required": [],
-                "type": "object",
-            },
-            "output": {
-                "$schema": "http://json-schema.org/draft-07/schema#",
-                "type": "null",
+                        "state": {"enum": ["RUNNING", "STOPPED", "UNKNOWN"]},
+                        "debug": {"type": "boolean"},
+                        "port": {"anyOf": [{"type": "integer"}, {"type": "number"}]},
+                        "tags": {"items": {"type": "string"}, "type": "array"},
+                    },
+                    "required": [],
+                    "type": "object",
+                }
             },
-        },
+            ["service"],
+            {"type": "null"},
+        ),
+        "example.service._secret": build_function_schema(
+            {"secret": {"anyOf": [{"type": "string"}, {"type": "null"}]}}, [], {"type": "null"}
+        ),
     }
     expected.update(init_schema)
     assert process_package(os.path.join("test", "example")) == expected
     assert process_package(os.path.join("test", "example"), exclude_patterns=["service*"]) == init_schema
+    monkeypatch.setattr(functions, "PREFETCH_READ_AHEAD", 1)
+    assert process_package(os.path.join("test", "example")) == expected
+    assert process_package(os.path.join("test", "example"), max_workers=2) == expected
+    assert process_package(os.path.join("test", "example"), max_workers=None) == expected
+    monkeypatch.setattr(os, "cpu_count", lambda: None)
+    assert process_package(os.path.join("test", "example"), max_workers=None) == expected
     current_dir = os.getcwd()
     os.chdir("test")
     try:
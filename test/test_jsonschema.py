@@ -1,9 +1,10 @@
+import ast
 import functools
 
 import pytest
 
 from pytoschema.common import init_name_to_schema_map, InvalidTypeAnnotation
-from pytoschema.jsonschema import get_schema_from_ast_element
+from pytoschema.jsonschema import get_schema_from_ast_element, NULL_SCHEMA
 
 from .conftest import assert_expected_value_or_exception, build_ast_annotation_element, TEST_TYPING_NAMESPACE
 
@@ -37,6 +38,22 @@ from .conftest import assert_expected_value_or_exception, build_ast_annotation_e
                 "Are you missing an import?",
             ),
         ],
+        [
+            build_ast_annotation_element("typing.Any[2]"),
+            InvalidTypeAnnotation(
+                build_ast_annotation_element("typing.Any[2]"),
+                "Only valid subscript type annotations are Dict, List, Literal, Optional, Union. "
+                "Are you missing an import?",
+            ),
+        ],
+        [
+            build_ast_annotation_element("eval(3)[2]"),
+            InvalidTypeAnnotation(
+                build_ast_annotation_element("eval(3)[2]"),
+                "Only valid subscript type annotations are Dict, List, Literal, Optional, Union. "
+                "Are you missing an import?",
+            ),
+        ],
         [build_ast_annotation_element("typing.List[str]"), {"items": {"type": "string"}, "type": "array"}],
         [build_ast_annotation_element("typing.Literal['red']"), {"enum": ["red"]}],
         [
@@ -106,6 +123,8 @@ from .conftest import assert_expected_value_or_exception, build_ast_annotation_e
         "name_float",
         "name_invalid",
         "subscript_invalid",
+        "subscript_invalid_typing",
+        "subscript_invalid_not_named",
         "subscript_single_list",
         "subscript_single_literal",
         "subscript_single_literal_invalid_no_constant",
@@ -127,3 +146,44 @@ def test_get_json_schema_from_ast_element(ast_element, expected):
         functools.partial(get_schema_from_ast_element, ast_element, TEST_TYPING_NAMESPACE, init_name_to_schema_map()),
         expected,
     )
+
+
+def test_get_json_schema_from_ast_element_shared_null_schema():
+    assert get_schema_from_ast_element(build_ast_annotation_element("None"), {}, {}) is NULL_SCHEMA
+    optional_schema = get_schema_from_ast_element(
+        build_ast_annotation_element("typing.Optional[str]"), TEST_TYPING_NAMESPACE, init_name_to_schema_map()
+    )
+    assert optional_schema["anyOf"][1] is NULL_SCHEMA
+
+
+def test_get_json_schema_from_ast_element_memo():
+    ast_element = build_ast_annotation_element("typing.Optional[str]")
+    memo = {}
+    schema = get_schema_from_ast_element(ast_element, TEST_TYPING_NAMESPACE, init_name_to_schema_map(), memo)
+    assert memo[ast_element] is schema
+    assert get_schema_from_ast_element(ast_element, TEST_TYPING_NAMESPACE, {}, memo) is schema
+    # Elements of freed trees must never be mistaken for new ones, i.e. by a reused memory address
+    for index in range(200):
+        text, expected = (
+            ("typing.List[int]", {"type": "array", "items": {"type": "integer"}})
+            if index % 2
+            else ("str", {"type": "string"})
+        )
+        assert (
+            get_schema_from_ast_element(
+                ast.parse(text).body[0].value, TEST_TYPING_NAMESPACE, init_name_to_schema_map(), memo
+            )
+            == expected
+        )
+
+
+def test_get_json_schema_from_ast_element_nested():
+    schema = get_schema_from_ast_element(
+        build_ast_annotation_element("typing.List[" * 50 + "int" + "]" * 50),
+        TEST_TYPING_NAMESPACE,
+        init_name_to_schema_map(),
+    )
+    for _ in range(50):
+        assert schema["type"] == "array"
+        schema = schema["items"]
+    assert schema == {"type": "integer"}
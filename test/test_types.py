@@ -12,6 +12,7 @@ from pytoschema.types import (
     process_alias,
     process_import,
     process_import_from,
+    process_import_froms,
     process_assign,
     process_class_def,
 )
@@ -36,13 +37,13 @@ def test_process_alias(alias_object, expected):
             ast.parse("import typing as foo").body[0],
             (
                 {
-                    "Union": {"foo.Union"},
-                    "List": {"foo.List"},
-                    "Dict": {"foo.Dict"},
-                    "Optional": {"foo.Optional"},
-                    "Any": {"foo.Any"},
-                    "TypedDict": {"foo.TypedDict"},
-                    "Literal": {"foo.Literal"},
+                    "foo.Union": "Union",
+                    "foo.List": "List",
+                    "foo.Dict": "Dict",
+                    "foo.Optional": "Optional",
+                    "foo.Any": "Any",
+                    "foo.TypedDict": "TypedDict",
+                    "foo.Literal": "Literal",
                 },
                 dict(
                     init_name_to_schema_map(),
@@ -64,18 +65,7 @@ def test_process_alias(alias_object, expected):
         ],
         [
             ast.parse("import os").body[0],
-            (
-                {
-                    "Union": set(),
-                    "List": set(),
-                    "Dict": set(),
-                    "Optional": set(),
-                    "Any": set(),
-                    "TypedDict": set(),
-                    "Literal": set(),
-                },
-                init_name_to_schema_map(),
-            ),
+            ({}, init_name_to_schema_map()),
         ],
     ],
     ids=["typing", "no_typing_nor_enum"],
@@ -92,13 +82,31 @@ def test_process_import(ast_import: ast.Import, expected: Tuple[TypingNamespace,
     [
         [
             ast.parse("a = typing.Optional[str]").body[0],
-            dict(init_typing_namespace(), **{"Optional": {"typing.Optional"}}),
+            {"typing.Optional": "Optional"},
             init_name_to_schema_map(),
             dict(init_name_to_schema_map(), **{"a": {"anyOf": [{"type": "string"}, {"type": "null"}]}}),
         ],
         [ast.parse("a = b[34]").body[0], init_typing_namespace(), init_name_to_schema_map(), init_name_to_schema_map()],
+        [
+            ast.parse("a = typing.Any[str]").body[0],
+            {"typing.Any": "Any"},
+            init_name_to_schema_map(),
+            init_name_to_schema_map(),
+        ],
+        [
+            ast.parse("a = b()[0]").body[0],
+            init_typing_namespace(),
+            init_name_to_schema_map(),
+            init_name_to_schema_map(),
+        ],
+        [
+            ast.parse("a = b[0][1]").body[0],
+            init_typing_namespace(),
+            init_name_to_schema_map(),
+            init_name_to_schema_map(),
+        ],
     ],
-    ids=["processed", "not_processed"],
+    ids=["processed", "not_processed", "not_processed_not_subscript_type", "call_subscript", "nested_subscript"],
 )
 def test_process_assign(
     ast_assign: ast.Assign,
@@ -132,7 +140,7 @@ def test_process_assign(
     model: str
     plate: str"""
             ).body[0],
-            dict(init_typing_namespace(), **{"TypedDict": {"typing.TypedDict"}}),
+            {"typing.TypedDict": "TypedDict"},
             init_name_to_schema_map(),
             dict(
                 init_name_to_schema_map(),
@@ -153,7 +161,7 @@ def test_process_assign(
     model: str
     plate: str"""
             ).body[0],
-            dict(init_typing_namespace(), **{"TypedDict": {"typing.TypedDict"}}),
+            {"typing.TypedDict": "TypedDict"},
             init_name_to_schema_map(),
             dict(
                 init_name_to_schema_map(),
@@ -186,12 +194,12 @@ def test_process_class_def(
         [
             ast.parse("from typing import Any").body[0],
             ".",
-            (dict(init_typing_namespace(), **{"Any": {"Any"}}), dict(init_name_to_schema_map(), **{"Any": ANY_SCHEMA})),
+            ({"Any": "Any"}, dict(init_name_to_schema_map(), **{"Any": ANY_SCHEMA})),
         ],
         [
             ast.parse("from typing import Union").body[0],
             ".",
-            (dict(init_typing_namespace(), **{"Union": {"Union"}}), init_name_to_schema_map()),
+            ({"Union": "Union"}, init_name_to_schema_map()),
         ],
         [ast.parse("from enum import foo").body[0], ".", (init_typing_namespace(), init_name_to_schema_map())],
         [ast.parse("from typing import foo").body[0], ".", (init_typing_namespace(), init_name_to_schema_map())],
@@ -227,9 +235,14 @@ def test_process_import_from_local():
         with open(subpackage_bar, "w") as f:
             f.write(
                 "from .. import A\nfrom ..foo import B\nfrom . import C\nfrom .baz import D\nfrom .baz import bad\n"
+                "from .baz import D, E\nfrom .baz import H\n"
             )
         with open(subpackage_baz, "w") as f:
-            f.write("import typing\n\n\nD = typing.Dict[str, int]\n")
+            # Unused relative imports are never followed, even if the module does not exist
+            f.write(
+                "from typing import Dict, TypedDict\n\nfrom .missing import F\n\n\nD = E = Dict[str, int]\nG = F\n\n\n"
+                "class H(TypedDict):\n    d: D\n\n    def f(self):\n        return F\n"
+            )
         # Tests
         typing_namespace = init_typing_namespace()
         b_schema = {
@@ -255,9 +268,9 @@ def test_process_import_from_local():
                 "B": b_schema,
             }
         with open(subpackage_bar) as f:
-            file_content = f.read()
+            ast_module = ast.parse(f.read())
             name_to_schema_map = init_name_to_schema_map()
-            process_import_from(ast.parse(file_content).body[0], subpackage, typing_namespace, name_to_schema_map)
+            process_import_from(ast_module.body[0], subpackage, typing_namespace, name_to_schema_map)
             assert name_to_schema_map == {
                 "bool": {"type": "boolean"},
                 "int": {"type": "integer"},
@@ -266,7 +279,7 @@ def test_process_import_from_local():
                 "A": a_schema,
             }
             name_to_schema_map = init_name_to_schema_map()
-            process_import_from(ast.parse(file_content).body[1], subpackage, typing_namespace, name_to_schema_map)
+            process_import_from(ast_module.body[1], subpackage, typing_namespace, name_to_schema_map)
             assert name_to_schema_map == {
                 "bool": {"type": "boolean"},
                 "int": {"type": "integer"},
@@ -275,7 +288,7 @@ def test_process_import_from_local():
                 "B": b_schema,
             }
             name_to_schema_map = init_name_to_schema_map()
-            process_import_from(ast.parse(file_content).body[2], subpackage, typing_namespace, name_to_schema_map)
+            process_import_from(ast_module.body[2], subpackage, typing_namespace, name_to_schema_map)
             assert name_to_schema_map == {
                 "bool": {"type": "boolean"},
                 "int": {"type": "integer"},
@@ -284,7 +297,7 @@ def test_process_import_from_local():
                 "C": {"anyOf": [{"type": "boolean"}, {"type": "number"}]},
             }
             name_to_schema_map = init_name_to_schema_map()
-            process_import_from(ast.parse(file_content).body[3], subpackage, typing_namespace, name_to_schema_map)
+            process_import_from(ast_module.body[3], subpackage, typing_namespace, name_to_schema_map)
             assert name_to_schema_map == {
                 "bool": {"type": "boolean"},
                 "int": {"type": "integer"},
@@ -293,10 +306,37 @@ def test_process_import_from_local():
                 "D": {"additionalProperties": {"type": "integer"}, "type": "object"},
             }
             name_to_schema_map = init_name_to_schema_map()
-            process_import_from(ast.parse(file_content).body[4], subpackage, typing_namespace, name_to_schema_map)
+            process_import_from(ast_module.body[4], subpackage, typing_namespace, name_to_schema_map)
             assert name_to_schema_map == {
                 "bool": {"type": "boolean"},
                 "int": {"type": "integer"},
                 "float": {"type": "number"},
                 "str": {"type": "string"},
             }
+            name_to_schema_map = init_name_to_schema_map()
+            process_import_from(ast_module.body[5], subpackage, typing_namespace, name_to_schema_map)
+            assert name_to_schema_map == {
+                "bool": {"type": "boolean"},
+                "int": {"type": "integer"},
+                "float": {"type": "number"},
+                "str": {"type": "string"},
+                "D": {"additionalProperties": {"type": "integer"}, "type": "object"},
+            }
+            name_to_schema_map = init_name_to_schema_map()
+            process_import_froms(ast_module.body, subpackage, typing_namespace, name_to_schema_map)
+            assert name_to_schema_map == {
+                "bool": {"type": "boolean"},
+                "int": {"type": "integer"},
+                "float": {"type": "number"},
+                "str": {"type": "string"},
+                "A": a_schema,
+                "B": b_schema,
+                "C": {"anyOf": [{"type": "boolean"}, {"type": "number"}]},
+                "D": {"additionalProperties": {"type": "integer"}, "type": "object"},
+                "H": {
+                    "type": "object",
+                    "properties": {"d": {"additionalProperties": {"type": "integer"}, "type": "object"}},
+                    "required": ["d"],
+                    "additionalProperties": False,
+                },
+            }